@@ -31,6 +31,8 @@ class GripperApp:
         self.view.on_save_speed = self.save_speed
 
         self._refresh_com_ports()
+        # 关闭窗口时先断开，释放串口锁并删除租约
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self._debounce_timers = {}  # 用于存储各控件的防抖定时器
         self._DEBOUNCE_DELAY = 0.15  # 150ms，可根据体验调整
@@ -45,13 +47,22 @@ class GripperApp:
             self.view.append_status(tr("请先选择 COM 口"))
             return
         debug = self.view.is_debug_enabled()
-        self.model = LEBAI_Gripper(com=com, debug=debug)
+        self.model = LEBAI_Gripper(com=com, debug=debug, handoff=self.view.is_handoff_enabled())
+        model = self.model
+        self.model.on_connection_lost = lambda: self.root.after(0, lambda: self._on_connection_lost(model))
         if self.model.connect():
             self.view.set_connected(True)
-            self.view.append_status(tr("✅ 已连接到 {com}").format(com=com))
+            if self.model.role == 'waiter':
+                pid = self.model.lease.get('pid', '?')
+                self.view.append_status(tr("🔗 {com} 已被进程 {pid} 占用，请求将由其转发").format(com=com, pid=pid))
+            else:
+                self.view.append_status(tr("✅ 已连接到 {com}").format(com=com))
             self.running = True
             self.polling_thread = threading.Thread(target=self._poll_status, daemon=True)
             self.polling_thread.start()
+        elif self.model.lease:
+            pid = self.model.lease.get('pid', '?')
+            self.view.append_status(tr("❌ {com} 已被进程 {pid} 占用").format(com=com, pid=pid))
         else:
             self.view.append_status(tr("❌ 连接失败: {com}").format(com=com))
 
@@ -73,6 +84,18 @@ class GripperApp:
         self.view.set_connected(False)
         self.view.append_status(tr("🔌 已断开连接"))
 
+    def _on_close(self):
+        if self.model:
+            self.disconnect()
+        self.root.destroy()
+
+    def _on_connection_lost(self, model):
+        """转发的 owner 已退出且无法重新连接（在主线程中执行）"""
+        if model is not self.model or not self.running:
+            return
+        self.view.append_status(tr("⚠️ 与 {com} 的连接已丢失").format(com=model.com))
+        self.disconnect()
+
     def _poll_status(self):
         """后台线程：定期读取状态"""
         while self.running and self.model:
@@ -83,6 +106,10 @@ class GripperApp:
                 homing = self.model.is_homing_done()
 
                 status_str = f"Pos: {pos} | Torque: {torque} | Moving: {not done if done is not None else '?'} | Homing: {homing}"
+                if self.view.is_debug_enabled():
+                    # owner：本进程请求耗时 / 替其它进程转发的耗时；waiter：转发往返耗时
+                    for role, stats in self.model.latency_stats().items():
+                        status_str += f" | {role}: {stats.summary()}"
                 self.root.after(0, lambda s=status_str: self.view.append_status(s))
                 time.sleep(0.5)
             except Exception as e:
@@ -1,33 +1,155 @@
 # i18n/__init__.py
 import json
+import marshal
 import os
+import sys
+import threading
 from pathlib import Path
 
 I18N_DIR = Path(__file__).parent
+# 预编译目录表存放位置（已被 .gitignore 忽略，可随时删除重建）
+COMPILED_DIR = I18N_DIR / "__pycache__"
+COMPILED_SUFFIX = ".catalog"
+# 预编译格式版本号，格式变化时递增，旧缓存会自动失效
+_CATALOG_VERSION = 2
+
 _current_lang = "zh"
 _translations = {}
 
-def get_available_languages():
-    """自动扫描 i18n 目录，找出所有 .json 翻译文件（如 zh.json, en.json）"""
-    lang_files = I18N_DIR.glob("*.json")
-    langs = []
-    for f in lang_files:
-        name = f.stem  # 去掉 .json
-        if name != "messages":  # 排除模板文件
-            langs.append(name)
-    return sorted(langs)
+_catalogs = {}               # lang -> 已加载的翻译字典（进程内缓存）
+_catalog_lock = threading.Lock()
+_available_languages = None  # get_available_languages() 的缓存
+_preload_thread = None
+
+def get_available_languages(refresh: bool = False):
+    """自动扫描 i18n 目录，找出所有 .json 翻译文件（如 zh.json, en.json）
+
+    结果只扫描一次并缓存；新增语言文件后传入 refresh=True 重新扫描。
+    """
+    global _available_languages
+    if _available_languages is None or refresh:
+        langs = []
+        for f in I18N_DIR.glob("*.json"):
+            name = f.stem  # 去掉 .json
+            if name != "messages":  # 排除模板文件
+                langs.append(name)
+        _available_languages = sorted(langs)
+    return list(_available_languages)
+
+def _compiled_path(lang: str) -> Path:
+    return COMPILED_DIR / f"{lang}{COMPILED_SUFFIX}"
+
+def _source_stamp(lang_file: Path):
+    """用源 JSON 的 mtime + 大小判断预编译文件是否过期"""
+    st = lang_file.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+def _compact(data: dict) -> dict:
+    """去掉译文与原文相同或尚未翻译（空）的条目（tr() 找不到时本来就返回原文），并驻留字符串"""
+    return {
+        sys.intern(k): v
+        for k, v in data.items()
+        if isinstance(k, str) and isinstance(v, str) and v and v != k
+    }
+
+def _read_compiled(lang: str, stamp):
+    """读取预编译目录表，版本或源文件时间戳不符时返回 None"""
+    try:
+        with open(_compiled_path(lang), "rb") as f:
+            payload = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (not isinstance(payload, tuple) or len(payload) != 3
+            or payload[0] != _CATALOG_VERSION or payload[1] != stamp
+            or not isinstance(payload[2], dict)):
+        return None
+    return payload[2]
+
+def _write_compiled(lang: str, stamp, catalog: dict):
+    """写入预编译目录表；目录只读等情况直接忽略，下次再从 JSON 加载"""
+    target = _compiled_path(lang)
+    tmp = target.with_suffix(f"{COMPILED_SUFFIX}.{os.getpid()}.tmp")
+    try:
+        COMPILED_DIR.mkdir(exist_ok=True)
+        with open(tmp, "wb") as f:
+            marshal.dump((_CATALOG_VERSION, stamp, catalog), f)
+        os.replace(tmp, target)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
 
 def _load_language(lang: str):
     lang_file = I18N_DIR / f"{lang}.json"
-    if lang_file.exists():
+    if not lang_file.exists():
+        return {}
+    stamp = _source_stamp(lang_file)
+    catalog = _read_compiled(lang, stamp)
+    if catalog is None:
         with open(lang_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+            catalog = _compact(json.load(f))
+        _write_compiled(lang, stamp, catalog)
+    return catalog
+
+def _get_catalog(lang: str) -> dict:
+    """从缓存取目录表，未命中时加载一次"""
+    catalog = _catalogs.get(lang)
+    if catalog is not None:
+        return catalog
+    with _catalog_lock:
+        catalog = _catalogs.get(lang)
+        if catalog is None:
+            catalog = _load_language(lang)
+            _catalogs[lang] = catalog
+    return catalog
+
+def compile_catalogs(langs=None):
+    """为所有（或指定）语言生成预编译目录表，返回已编译的语言列表"""
+    langs = get_available_languages(refresh=True) if langs is None else list(langs)
+    for lang in langs:
+        lang_file = I18N_DIR / f"{lang}.json"
+        if not lang_file.exists():
+            continue
+        with open(lang_file, "r", encoding="utf-8") as f:
+            catalog = _compact(json.load(f))
+        _write_compiled(lang, _source_stamp(lang_file), catalog)
+        with _catalog_lock:
+            _catalogs[lang] = catalog
+    return langs
+
+def preload_languages(langs=None) -> threading.Thread:
+    """在后台线程中预加载所有（或指定）语言，切换语言时无需再读盘
+
+    重复调用时若上一次预加载仍在进行，直接返回该线程。
+    """
+    global _preload_thread
+    if _preload_thread is not None and _preload_thread.is_alive():
+        return _preload_thread
+    langs = get_available_languages() if langs is None else list(langs)
+
+    def _worker():
+        for lang in langs:
+            try:
+                _get_catalog(lang)
+            except (OSError, ValueError):
+                pass  # 损坏的语言文件留到 set_language() 时再报错
+
+    _preload_thread = threading.Thread(target=_worker, name="i18n-preload", daemon=True)
+    _preload_thread.start()
+    return _preload_thread
+
+def clear_cache():
+    """清空进程内缓存（语言文件在运行时被修改后调用）"""
+    global _available_languages
+    with _catalog_lock:
+        _catalogs.clear()
+    _available_languages = None
 
 def set_language(lang: str):
     global _current_lang, _translations
+    _translations = _get_catalog(lang)
     _current_lang = lang
-    _translations = _load_language(lang)
 
 def get_language() -> str:
     return _current_lang
@@ -35,4 +157,4 @@ def get_language() -> str:
 def tr(text: str) -> str:
     if _current_lang == "zh" and not _translations:
         return text
-    return _translations.get(text, text)
\ No newline at end of file
+    return _translations.get(text, text)
@@ -1,6 +1,11 @@
-# extract_i18n.py
-import re
+# i18n/lang_extractor.py
+import argparse
+import ast
+import hashlib
 import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # 向上找，直到找到包含 'view' 和 'controller' 的目录
@@ -16,59 +21,256 @@ def find_project_root(start_path: Path) -> Path:
 PROJECT_ROOT = find_project_root(Path(__file__).parent)
 I18N_DIR = PROJECT_ROOT / "i18n"
 OUTPUT_FILE = I18N_DIR / "messages.json"
+# 按文件缓存的提取结果（已被 .gitignore 忽略）
+CACHE_FILE = I18N_DIR / "__pycache__" / "extract_cache.json"
+CACHE_VERSION = 1
 
+# 源语言：代码里写的原文就是中文，新增条目直接填原文
+SOURCE_LANG = "zh"
+LANG_FILES = {
+    "zh": I18N_DIR / "zh.json",
+    "en": I18N_DIR / "en.json",
+}
 
 # 排除目录
-EXCLUDE_DIRS = {"venv", "__pycache__", ".git", "build", "dist"}
+EXCLUDE_DIRS = {"venv", ".venv", "__pycache__", ".git", "build", "dist"}
+# 被当作翻译函数的名字：tr("...")、_("...")、i18n.tr("...")
+TR_FUNCS = {"tr", "_"}
+# 变化的文件少于这个数时不启动进程池（进程启动本身比解析几个文件还慢）
+PARALLEL_THRESHOLD = 8
 
-def find_tr_calls_in_file(file_path: Path):
-    """从 .py 文件中提取 tr("...") 中的字符串"""
+def _file_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _is_tr_call(node: ast.Call) -> bool:
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id in TR_FUNCS
+    if isinstance(func, ast.Attribute):
+        return func.attr == "tr"
+    return False
+
+def find_tr_calls_in_source(source: str, filename: str = "<string>"):
+    """用 AST 提取 tr("...") 中的字符串
+
+    返回 (strings, fstring_lines)：
+    - strings：字面量参数（支持多行调用、隐式拼接的字符串）
+    - fstring_lines：以 f-string 为参数的调用所在行号，运行时的键无法静态确定
+    """
+    tree = ast.parse(source, filename=filename)
+    strings = set()
+    fstring_lines = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args or not _is_tr_call(node):
+            continue
+        arg = node.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            strings.add(arg.value)
+        elif isinstance(arg, ast.JoinedStr):
+            fstring_lines.append(node.lineno)
+    return strings, sorted(fstring_lines)
+
+def scan_file(file_path: str, cached_hash: str = None):
+    """扫描单个文件（可在子进程中运行）
+
+    内容哈希与 cached_hash 相同时只返回哈希，表示可以沿用缓存结果。
+    """
+    path = Path(file_path)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except Exception as e:
-        print(f"⚠️ 无法读取 {file_path}: {e}")
-        return set()
-
-    # 正则匹配 tr("...") 或 _("...")
-    # 支持多行、转义引号（简化版）
-    pattern = r'''(?:\btr|_)\(\s*["']((?:[^"']|\\["'])*?)["']\s*\)'''
-    matches = re.findall(pattern, content)
-    # 去掉转义（如 \" → "）
-    cleaned = [s.replace('\\"', '"').replace("\\'", "'") for s in matches]
-    return set(cleaned)
-
-def main():
-    all_strings = set()
+        # 先 stat 再读：读取期间文件被保存时 mtime 会对不上，下次运行自然重新扫描
+        st = path.stat()
+        data = path.read_bytes()
+    except OSError as e:
+        return {"error": f"无法读取: {e}"}
+    entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": _file_hash(data)}
+    if entry["sha1"] == cached_hash:
+        return entry
+    try:
+        strings, fstring_lines = find_tr_calls_in_source(data.decode("utf-8"), str(path))
+    except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+        entry.update(strings=[], fstrings=[], error=f"解析失败: {e}")
+        return entry
+    entry.update(strings=sorted(strings), fstrings=fstring_lines)
+    return entry
 
-    for py_file in PROJECT_ROOT.rglob("*.py"):
+def iter_source_files(root: Path = PROJECT_ROOT):
+    self_path = Path(__file__).resolve()
+    for py_file in sorted(root.rglob("*.py")):
         # 跳过排除目录
-        if any(part in EXCLUDE_DIRS for part in py_file.parts):
+        if any(part in EXCLUDE_DIRS for part in py_file.relative_to(root).parts):
             continue
         # 跳过自己
-        if py_file.name == "extract_i18n.py":
+        if py_file.resolve() == self_path:
+            continue
+        yield py_file
+
+def _load_json(path: Path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _write_json_if_changed(path: Path, data) -> bool:
+    """内容没变就不写盘，避免无谓地刷新 mtime（会让预编译的语言目录表失效）"""
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return True
+
+def load_cache(path: Path = CACHE_FILE) -> dict:
+    cache = _load_json(path, {})
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+def save_cache(files: dict, path: Path = CACHE_FILE):
+    try:
+        _write_json_if_changed(path, {"version": CACHE_VERSION, "files": files})
+    except OSError as e:
+        print(f"⚠️ 无法写入缓存 {path}: {e}")
+
+def extract(root: Path = PROJECT_ROOT, cache: dict = None, jobs: int = None):
+    """增量提取：mtime/大小未变的文件直接用缓存，其余文件并行扫描
+
+    返回 (新缓存, 被重新扫描的文件数)。
+    本次读取/解析失败的文件沿用上次缓存的字符串并带上 "error"，
+    这样它们的键不会被误判为过期（更不会被 --prune 删掉）。
+    """
+    cache = cache or {}
+    new_cache = {}
+    pending = []
+    for py_file in iter_source_files(root):
+        rel = py_file.relative_to(root).as_posix()
+        old = cache.get(rel)
+        try:
+            st = py_file.stat()
+        except OSError as e:
+            if old:
+                new_cache[rel] = _keep_failed(old, f"无法读取: {e}")
             continue
+        if old and old.get("mtime_ns") == st.st_mtime_ns and old.get("size") == st.st_size:
+            new_cache[rel] = old
+        else:
+            pending.append((rel, py_file, old))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    args = [(str(p), old.get("sha1") if old else None) for _, p, old in pending]
+    if jobs > 1 and len(pending) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(scan_file, *zip(*args), chunksize=4))
+    else:
+        results = [scan_file(*a) for a in args]
+
+    for (rel, _, old), result in zip(pending, results):
+        if "strings" not in result:
+            if "sha1" in result and old:
+                # 只是 mtime 变了，内容相同
+                if old.get("mtime_ns") is None:
+                    # 上次是读取失败（见 _keep_failed），这次读到了，错误不再成立
+                    old = {k: v for k, v in old.items() if k != "error"}
+                result = {**old, **result}
+            elif old:
+                result = _keep_failed(old, result.get("error", "未知错误"))
+            else:
+                print(f"⚠️ {rel}: {result.get('error', '未知错误')}")
+                continue
+        elif result.get("error") and old:
+            # 解析失败（如编辑到一半的语法错误）：沿用旧字符串，文件修好后自然会重新解析
+            result = {**result, "strings": old.get("strings", [])}
+        new_cache[rel] = result
+    return new_cache, len(pending)
+
+def _keep_failed(old: dict, error: str) -> dict:
+    """读取失败时保留旧结果；清掉 mtime，保证下次运行一定重新扫描"""
+    return {**old, "mtime_ns": None, "error": error}
+
+def merge_translations(keys, existing: dict, lang: str, prune: bool = False) -> dict:
+    """把提取到的键合并进已有翻译，已有译文一律保留
+
+    新键在源语言中填原文，其它语言留空待翻译；prune=True 时删除过期键。
+    """
+    merged = {}
+    for key in sorted(keys):
+        if key in existing:
+            merged[key] = existing[key]
+        else:
+            merged[key] = key if lang == SOURCE_LANG else ""
+    if not prune:
+        for key in sorted(set(existing) - set(keys)):
+            merged[key] = existing[key]
+    return dict(sorted(merged.items()))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="提取代码中的 tr(\"...\") 文本并更新翻译文件")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument("--no-cache", action="store_true", help="忽略缓存，重新扫描所有文件")
+    parser.add_argument("--prune", action="store_true", help="从翻译文件中删除代码里已不存在的键")
+    parser.add_argument("--check", action="store_true", help="只检查不写翻译文件；有缺失、过期键或无法读取的文件时返回 1")
+    args = parser.parse_args(argv)
+
+    cache = {} if args.no_cache else load_cache()
+    files, rescanned = extract(PROJECT_ROOT, cache, args.jobs)
+
+    all_strings = set()
+    failed = 0
+    for rel, entry in sorted(files.items()):
+        if entry.get("error"):
+            failed += 1
+            print(f"⚠️ {rel}: {entry['error']}（沿用上次提取的结果）")
+        for line in entry.get("fstrings", []):
+            print(f"⚠️ {rel}:{line} tr() 的参数是 f-string，无法提取，请改用 tr(\"...{{x}}\").format(x=...)")
+        if entry["strings"]:
+            print(f"🔍 {rel} → {len(entry['strings'])} 条")
+            all_strings.update(entry["strings"])
+    print(f"\n⚡ 扫描 {len(files)} 个文件，其中 {rescanned} 个重新解析")
+
+    problems = failed
+    any_missing = False
+    prune = args.prune
+    if prune and failed:
+        print(f"\n⚠️ 有 {failed} 个文件读取/解析失败，本次不执行 --prune")
+        prune = False
+    outputs = {OUTPUT_FILE: {text: "" for text in sorted(all_strings)}}  # value 留空供翻译
+    for lang, path in LANG_FILES.items():
+        existing = _load_json(path, {})
+        stale = sorted(set(existing) - all_strings)
+        merged = merge_translations(all_strings, existing, lang, prune=prune)
+        missing = sorted(k for k in all_strings if not merged.get(k))
+        if missing:
+            print(f"\n📝 {path.name} 缺少 {len(missing)} 条翻译：")
+            for key in missing:
+                print(f"   + {key}")
+        if stale:
+            action = "已删除" if prune else "可用 --prune 删除"
+            print(f"\n🗑️ {path.name} 有 {len(stale)} 条过期键（{action}）：")
+            for key in stale:
+                print(f"   - {key}")
+        any_missing = any_missing or bool(missing)
+        problems += len(missing) + (0 if prune else len(stale))
+        outputs[path] = merged
 
-        strings = find_tr_calls_in_file(py_file)
-        if strings:
-            rel_path = py_file.relative_to(PROJECT_ROOT)
-            print(f"🔍 {rel_path} → {len(strings)} 条")
-            all_strings.update(strings)
+    # 缓存是内部状态，--check 也要保存，这样 pre-commit 检查同样是增量的
+    save_cache(files)
 
-    # 排序并保存
-    sorted_strings = sorted(all_strings)
-    messages = {text: "" for text in sorted_strings}  # value 留空供翻译
+    if args.check:
+        print(f"\n{'❌' if problems else '✅'} 检查完成，共 {problems} 个问题")
+        return 1 if problems else 0
 
-    I18N_DIR.mkdir(exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
+    for path, data in outputs.items():
+        if _write_json_if_changed(path, data):
+            print(f"📄 已更新: {path.relative_to(PROJECT_ROOT)}")
 
-    print(f"\n✅ 提取完成！共 {len(messages)} 条文本")
-    print(f"📄 模板文件已保存至: {OUTPUT_FILE}")
-    print("\n📝 下一步：")
-    print("1. 复制 messages.json 为 zh.json（默认语言可直接用原文）")
-    print("2. 复制 messages.json 为 en.json，并填写英文翻译")
-    print("3. 在代码中确保已导入: from i18n import tr")
+    print(f"\n✅ 提取完成！共 {len(all_strings)} 条文本")
+    if any_missing:
+        print("📝 下一步：在上面列出的翻译文件中填写缺少的译文")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,15 +1,31 @@
 # model/lebai_gripper.py
 import serial
 import serial.tools.list_ports
+import threading
 import time
+from model.port_lock import PortLock, HandoffServer, HandoffClient, LatencyStats
 
 class LEBAI_Gripper:
-    def __init__(self, com=None, baudrate=115200, address=1, debug=False):
+    LEASE_WAIT = 1.0  # 秒，waiter 等待 owner 发布租约的最长时间
+
+    def __init__(self, com=None, baudrate=115200, address=1, debug=False, handoff=False):
         self.com = com
         self.baudrate = baudrate
         self.address = address
         self.debug = debug
+        # 串口已被其它进程占用时，是否通过 owner 转发请求（而不是连接失败）
+        self.handoff = handoff
         self.ser = None
+        self.role = None    # 'owner'：本进程持有串口；'waiter'：通过 owner 转发
+        self.lease = None   # 当前持有者的租约（PID、开始时间等）
+        self._port_lock = None
+        self._handoff_server = None
+        self._handoff_client = None
+        self._bus_lock = threading.Lock()  # 轮询线程与命令线程、转发请求共用总线
+        self._reconnect_lock = threading.Lock()
+        self._owner_latency = LatencyStats()
+        # owner 消失且无法重新连接时调用（可能在后台线程中），供 controller 更新界面
+        self.on_connection_lost = None
         self.status = {
             'position': None,
             'torque': None,
@@ -31,8 +47,17 @@ class LEBAI_Gripper:
         return crc.to_bytes(2, byteorder='little')
 
     def connect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
+        self.disconnect()
+        port_lock = PortLock(self.com)
+        try:
+            acquired = port_lock.acquire()
+        except OSError as e:
+            # 建不了锁文件不代表串口被占用：无锁继续，只是失去跨进程保护
+            if self.debug:
+                print(f"[DEBUG] Port lock unavailable, continuing without it: {e}")
+            port_lock, acquired = None, True
+        if not acquired:
+            return self._connect_handoff(port_lock)
         try:
             self.ser = serial.Serial(
                 port=self.com,
@@ -42,30 +67,133 @@ class LEBAI_Gripper:
                 stopbits=serial.STOPBITS_ONE,
                 timeout=1
             )
-            return True
         except Exception as e:
+            if port_lock:
+                port_lock.release()
             if self.debug:
                 print(f"[ERROR] Connect failed: {e}")
             return False
+        self.role = 'owner'
+        if port_lock is None:
+            return True
+        self._port_lock = port_lock
+        # 先启动转发服务，再一次性写入完整租约，waiter 不会读到缺少端口的租约
+        lease = {}
+        try:
+            self._handoff_server = HandoffServer(self._locked_transfer)
+            lease = {'port': self._handoff_server.port, 'token': self._handoff_server.token.hex()}
+        except OSError as e:
+            if self.debug:
+                print(f"[DEBUG] Handoff server unavailable: {e}")
+        port_lock.write_lease(**lease)
+        self.lease = port_lock.lease
+        return True
+
+    def _connect_handoff(self, port_lock):
+        """串口被其它进程持有：按需通过 owner 的本地 socket 转发"""
+        self.lease = port_lock.read_live_lease()
+        if self.handoff:
+            # owner 刚拿到锁、还没写租约时，读到的要么没有，要么是已退出 owner 的旧租约，稍等片刻
+            deadline = time.monotonic() + self.LEASE_WAIT
+            while not (self.lease and self.lease.get('port')) and time.monotonic() < deadline:
+                time.sleep(0.05)
+                self.lease = port_lock.read_live_lease()
+        lease = self.lease or {}
+        if not self.handoff or not lease.get('port') or not lease.get('token'):
+            if self.debug:
+                print(f"[ERROR] {self.com} is locked by PID {lease.get('pid', '?')}")
+            return False
+        try:
+            self._handoff_client = HandoffClient(lease['port'], lease['token'])
+        except (OSError, ValueError) as e:
+            if self.debug:
+                print(f"[ERROR] Handoff to PID {lease.get('pid', '?')} failed: {e}")
+            return False
+        self.role = 'waiter'
+        return True
 
     def disconnect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-        self.ser = None
+        if self._handoff_client:
+            self._handoff_client.close()
+            self._handoff_client = None
+        if self._handoff_server:
+            self._handoff_server.close()
+            self._handoff_server = None
+        # 持有总线锁再关串口，避免打断正在收发的帧（包括替 waiter 转发的请求）
+        with self._bus_lock:
+            if self.ser and self.ser.is_open:
+                self.ser.close()
+            self.ser = None
+        if self._port_lock:
+            self._port_lock.release()
+            self._port_lock = None
+        self.role = None
+        self.lease = None
 
-    def _send_and_receive(self, packet: bytes, expected_length: int = None) -> bytes:
-        if not self.ser or not self.ser.is_open:
-            return None
+    def latency_stats(self) -> dict:
+        """各角色的耗时统计：owner（本进程请求，含等待总线）、served（替 waiter 执行）、waiter（转发往返）"""
+        stats = {}
+        if self.role == 'owner':
+            stats['owner'] = self._owner_latency
+            if self._handoff_server:
+                stats['served'] = self._handoff_server.latency
+        elif self.role == 'waiter' and self._handoff_client:
+            stats['waiter'] = self._handoff_client.latency
+        return stats
 
-        try:
+    def _locked_transfer(self, packet: bytes, expected_length: int = None) -> bytes:
+        """独占总线完成一次 发送-接收，返回原始应答（不校验）"""
+        with self._bus_lock:
+            if not self.ser or not self.ser.is_open:
+                return None
             self.ser.flushInput()
             self.ser.write(packet)
             self.ser.flush()
-            
+
             # 给 RS485 足够时间切换方向 + 设备响应
             time.sleep(0.02)  # 20ms
-            
-            response = self.ser.read(expected_length or 100)
+
+            return self.ser.read(expected_length or 100)
+
+    def _recover_handoff(self, client, err) -> bool:
+        """owner 断开后重新连接一次：锁空闲则成为 owner，否则转投新的 owner
+
+        失败时通知 on_connection_lost 并返回 False。
+        """
+        with self._reconnect_lock:
+            if self._handoff_client is not client:
+                # 其它线程已经处理过这次断开
+                return self.role is not None
+            if self.debug:
+                print(f"[DEBUG] Handoff lost ({err}), reconnecting {self.com}")
+            if self.connect():
+                return True
+        if self.on_connection_lost:
+            self.on_connection_lost()
+        return False
+
+    def _send_and_receive(self, packet: bytes, expected_length: int = None, _retry: bool = True) -> bytes:
+        client = self._handoff_client
+        if client:
+            transfer = client.transfer
+        elif self.ser and self.ser.is_open:
+            transfer = self._locked_transfer
+        else:
+            return None
+
+        try:
+            start = time.perf_counter()
+            try:
+                response = transfer(packet, expected_length)
+            except (ConnectionError, OSError) as e:
+                if client is None or not _retry:
+                    raise
+                if not self._recover_handoff(client, e):
+                    return None
+                return self._send_and_receive(packet, expected_length, _retry=False)
+            if self.role == 'owner':
+                # waiter 的往返耗时由 HandoffClient 自己统计
+                self._owner_latency.add(time.perf_counter() - start)
             
             # --- 以下逻辑全部在 try 内部 ---
             if not response:
@@ -0,0 +1,340 @@
+# model/port_lock.py
+"""串口的跨进程独占锁 + 租约信息 + 本地转发
+
+同一个串口只能由一个进程（owner）打开。后来者（waiter）可以读取租约
+（PID、开始时间、转发端口），并通过本机 socket 把请求交给 owner 代发，
+避免两个进程的帧在 RS485 总线上交错导致 CRC 错误。
+"""
+import json
+import os
+import re
+import secrets
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+LOCK_DIR = tempfile.gettempdir()
+LOCK_PREFIX = "lebai-gripper-"
+
+# 转发协议：请求 = 头(>HH: 包长, 期望应答长度) + 包；应答 = 头(>H: 长度) + 数据，长度 0 表示无应答
+_REQ_HEADER = struct.Struct(">HH")
+_RESP_HEADER = struct.Struct(">H")
+_TOKEN_BYTES = 16
+
+
+def _device_key(device: str) -> str:
+    """把串口名规范化成文件名：/dev/serial/by-id/... 与 /dev/ttyUSB0 指向同一设备时得到同一把锁"""
+    if os.name == "nt":
+        name = device.upper()
+        if name.startswith("\\\\.\\"):
+            name = name[4:]
+    else:
+        name = os.path.realpath(device)
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name).strip("_")
+
+
+def _pid_alive(pid: int) -> bool:
+    """判断进程是否仍在运行（Windows 上不能用 os.kill(pid, 0)，它会结束目标进程）"""
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # ERROR_ACCESS_DENIED：进程存在但无权访问
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 进程存在，属于别的用户
+    return True
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("handoff peer closed the connection")
+        buf += chunk
+    return buf
+
+
+class LatencyStats:
+    """简单的耗时统计（线程安全），单位为秒"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        return f"n={self.count} avg={self.avg * 1000:.1f}ms max={self.max * 1000:.1f}ms"
+
+
+class PortLock:
+    """基于锁文件的跨进程独占锁（POSIX 用 fcntl.flock，Windows 用 msvcrt.locking）
+
+    锁由操作系统持有，进程崩溃后自动释放，不会留下"僵尸锁"。
+    租约信息写在旁边的 .lease 文件里，供其它进程查看。
+    """
+
+    def __init__(self, device: str, lock_dir: str = LOCK_DIR):
+        key = _device_key(device)
+        self.device = device
+        self.lock_path = os.path.join(lock_dir, f"{LOCK_PREFIX}{key}.lock")
+        self.lease_path = os.path.join(lock_dir, f"{LOCK_PREFIX}{key}.lease")
+        self.lease = None
+        self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def _open_lock_file(self) -> int:
+        """打开（必要时创建）锁文件
+
+        锁文件放在共享的临时目录且不会删除，所以创建为所有人可读写；
+        别的用户创建的文件若不可写，就以只读方式打开（flock 对只读 fd 同样有效）。
+        两种方式都失败时抛出 OSError。
+        """
+        try:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        except PermissionError:
+            return os.open(self.lock_path, os.O_RDONLY)
+        if os.name != "nt":
+            try:
+                os.fchmod(fd, 0o666)  # 不受 umask 影响
+            except OSError:
+                pass  # 文件属于别的用户
+        return fd
+
+    def acquire(self) -> bool:
+        """非阻塞获取锁；已被其它进程持有时返回 False
+
+        无法创建/打开锁文件（如临时目录只读）时抛出 OSError，由调用方决定是否无锁继续。
+        租约不在这里写入，持有者准备好后调用 write_lease() 一次性发布。
+        """
+        if self._fd is not None:
+            return True
+        fd = self._open_lock_file()
+        try:
+            if os.name == "nt":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        # 用锁文件的 mtime 记录本次加锁时间，早于它的租约都来自已退出的 owner
+        try:
+            os.utime(self.lock_path)
+        except OSError:
+            pass  # 只读打开的锁文件：只能靠 PID 判断租约是否过期
+        return True
+
+    def write_lease(self, **extra):
+        """写入（或更新）租约：PID、开始时间，以及转发端口等附加信息"""
+        if self._fd is None:
+            return
+        if self.lease is None:
+            self.lease = {"device": self.device, "pid": os.getpid(), "started": time.time()}
+        self.lease.update(extra)
+        tmp = f"{self.lease_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.lease, f)
+            os.replace(tmp, self.lease_path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def read_lease(self):
+        """读取当前持有者的租约，读不到时返回 None"""
+        try:
+            with open(self.lease_path, "r", encoding="utf-8") as f:
+                lease = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return lease if isinstance(lease, dict) else None
+
+    def read_live_lease(self):
+        """读取租约，但忽略已退出的 owner 留下的旧租约
+
+        owner 关窗口或崩溃时不会删除 .lease；新 owner 加锁后、写租约前，
+        旧文件仍在。PID 已不存在、或开始时间早于本次加锁的租约都视为"尚未写入"。
+        """
+        lease = self.read_lease()
+        if not lease:
+            return None
+        try:
+            pid = int(lease.get("pid"))
+            started = float(lease.get("started"))
+        except (TypeError, ValueError):
+            return None
+        try:
+            acquired = os.stat(self.lock_path).st_mtime
+        except OSError:
+            acquired = 0.0
+        if started < acquired or not _pid_alive(pid):
+            return None
+        return lease
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            os.remove(self.lease_path)
+        except OSError:
+            pass
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        os.close(self._fd)
+        self._fd = None
+        self.lease = None
+
+
+class _HandoffHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        sock = self.request
+        if not server.track(sock):
+            return
+        try:
+            token = _recv_exact(sock, _TOKEN_BYTES)
+            if not secrets.compare_digest(token, server.token):
+                return
+            while True:
+                length, expected = _REQ_HEADER.unpack(_recv_exact(sock, _REQ_HEADER.size))
+                packet = _recv_exact(sock, length)
+                start = time.perf_counter()
+                try:
+                    resp = server.transfer(packet, expected or None) or b""
+                except Exception:
+                    resp = b""  # 串口异常按"无应答"返回，由 waiter 自行重试
+                server.latency.add(time.perf_counter() - start)
+                sock.sendall(_RESP_HEADER.pack(len(resp)) + resp)
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            server.untrack(sock)
+
+
+class HandoffServer(socketserver.ThreadingTCPServer):
+    """owner 端：在 127.0.0.1 上监听，替 waiter 执行 transfer(packet, expected_length)"""
+
+    daemon_threads = True
+    allow_reuse_address = False
+
+    def __init__(self, transfer):
+        super().__init__(("127.0.0.1", 0), _HandoffHandler)
+        self.transfer = transfer
+        self.token = secrets.token_bytes(_TOKEN_BYTES)
+        self.latency = LatencyStats()
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self.serve_forever, name="gripper-handoff", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def track(self, sock) -> bool:
+        """登记连接；服务已关闭时直接断开并返回 False（close() 之后才启动的处理线程）"""
+        with self._clients_lock:
+            if not self._closed:
+                self._clients.add(sock)
+                return True
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        return False
+
+    def untrack(self, sock):
+        with self._clients_lock:
+            self._clients.discard(sock)
+
+    def close(self):
+        """停止监听并断开所有 waiter，它们的后续请求会立即失败而不是挂起"""
+        self.shutdown()
+        self.server_close()
+        with self._clients_lock:
+            self._closed = True
+            clients, self._clients = self._clients, set()
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class HandoffClient:
+    """waiter 端：把请求转发给持有串口的进程"""
+
+    def __init__(self, port: int, token_hex: str, timeout: float = 5.0):
+        self._lock = threading.Lock()
+        self.latency = LatencyStats()
+        self._sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        try:
+            self._sock.sendall(bytes.fromhex(token_hex))
+        except (OSError, ValueError):
+            self._sock.close()
+            raise
+
+    def transfer(self, packet: bytes, expected_length: int = None):
+        with self._lock:
+            start = time.perf_counter()
+            self._sock.sendall(_REQ_HEADER.pack(len(packet), expected_length or 0) + packet)
+            (length,) = _RESP_HEADER.unpack(_recv_exact(self._sock, _RESP_HEADER.size))
+            resp = _recv_exact(self._sock, length) if length else None
+            self.latency.add(time.perf_counter() - start)
+        return resp
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
@@ -1,7 +1,7 @@
 # view/gripper_view.py
 import tkinter as tk
 from tkinter import ttk
-from i18n import tr, set_language, get_available_languages
+from i18n import tr, set_language, get_available_languages, preload_languages
 
 LANG_DISPLAY_NAMES = {
     "zh": "中文",
@@ -14,6 +14,7 @@ class GripperView:
     def __init__(self, root):
         self.root = root
         self.translatable_widgets = []
+        self._applied_texts = {}  # widget -> 当前显示的文本，用于跳过未变化的控件
         self._create_widgets()
         self._register_translatable_widgets()
         self.root.title(tr("LEBAI LMG-90 夹爪控制器"))
@@ -51,6 +52,7 @@ class GripperView:
         languages = get_available_languages()
         display_names = [LANG_DISPLAY_NAMES.get(code, code) for code in languages]
         self.lang_name_to_code = dict(zip(display_names, languages))
+        preload_languages(languages)  # 后台预加载，切换语言时不再读盘
         lang_menu = tk.OptionMenu(lang_container, self.lang_var, *display_names, command=self._on_lang_change_by_name)
         lang_menu.pack(side='left', padx=(5, 0))
         self._register_widget(lang_label, "语言")
@@ -73,6 +75,9 @@ class GripperView:
         self.debug_var = tk.BooleanVar()
         self.debug_cb = ttk.Checkbutton(com_frame, text=tr("Debug 模式"), variable=self.debug_var)
         self.debug_cb.grid(row=1, column=0, columnspan=2, sticky='w', **pad)
+        self.handoff_var = tk.BooleanVar(value=True)
+        self.handoff_cb = ttk.Checkbutton(com_frame, text=tr("端口被占用时转发"), variable=self.handoff_var)
+        self.handoff_cb.grid(row=1, column=2, columnspan=2, sticky='w', **pad)
 
         # === 控制 ===
         ctrl_outer, ctrl_frame = self._create_translatable_label_frame(self.root, tr("控制"))
@@ -134,6 +139,7 @@ class GripperView:
     # --- 以下方法保持不变 ---
     def _register_widget(self, widget, key: str):
         self.translatable_widgets.append((widget, key))
+        self._applied_texts[widget] = str(widget.cget('text'))
 
     def _register_translatable_widgets(self):
         # 原有
@@ -143,6 +149,7 @@ class GripperView:
         # 新增：串口设置区
         self._register_widget(self.com_port_label, "COM Port:")
         self._register_widget(self.debug_cb, "Debug 模式")
+        self._register_widget(self.handoff_cb, "端口被占用时转发")
         
         # 新增：控制区
         self._register_widget(self.pos_text_label, "位置 (0-100):")
@@ -160,13 +167,20 @@ class GripperView:
         lang_code = self.lang_name_to_code[display_name]
         set_language(lang_code)
         self._refresh_all_texts()
-        self.root.title(tr("LEBAI LMG-90 夹爪控制器"))
 
     def _refresh_all_texts(self):
+        """只重新配置文本确实发生变化的控件"""
+        applied = self._applied_texts
         for widget, key in self.translatable_widgets:
             if key.isdigit():
                 continue
-            widget.config(text=tr(key))
+            text = tr(key)
+            if applied.get(widget) != text:
+                widget.config(text=text)
+                applied[widget] = text
+        title = tr("LEBAI LMG-90 夹爪控制器")
+        if self.root.title() != title:
+            self.root.title(title)
 
     # --- 事件回调 ---
     def _on_connect(self):
@@ -214,4 +228,6 @@ class GripperView:
     def get_selected_com(self):
         return self.com_var.get()
     def is_debug_enabled(self):
-        return self.debug_var.get()
\ No newline at end of file
+        return self.debug_var.get()
+    def is_handoff_enabled(self):
+        return self.handoff_var.get()
\ No newline at end of file